@@ -8,16 +8,33 @@ Optionally sort output by hue, saturation, or value.
 
 Created by Will Fuller, sinistergfx@gmail.com"""
 
+import io
+import sys
 import time
+import re
 import csv
-import colorsys
+import operator
 import argparse
+import functools
 
 import pyperclip
 
 VERSION = '2.1.1 (2017.10.15)'
 SWATCH_CHAR = '▄'
 SWATCH_SIZE = '72px'
+READ_BUFFER_SIZE = 1 << 20  # 1 MiB
+SNIFF_SIZE = 1024  # clipboard chars checked for a file path or data format
+
+# Swatch HTML with the run-constant size and character baked in
+_HTML_TMPL = (
+    '<font color=%s data-rgb="%d,%d,%d" size=' + SWATCH_SIZE + '>'
+    + SWATCH_CHAR + ' </font><b>HEX:</b> %s - <b>RGB:</b> (%d, %d, %d)<br>\n'
+)
+
+# data-rgb is optional so HTML from older versions can still be read
+_COLOR_RE = re.compile(
+    r'color=(#[0-9a-fA-F]{6})(?: data-rgb="(\d+),(\d+),(\d+)")?'
+)
 
 
 def exit_wait(wait=0):
@@ -27,84 +44,151 @@ def exit_wait(wait=0):
     exit()
 
 
+# Message templates for messager(), '%s' is filled with extra_info
+_MESSAGES = {
+    'error_clipboard_nodata':
+        'Error: No CSV data found in clipboard.\n',
+    'error_nodata':
+        'Error: No CSV data provided.\n',
+    'error_sort':
+        'Error: Unrecognized sort type: %s\n',
+    'info_tryhelp':
+        "Try 'nix_csv_parser.py --help' for more information\n",
+    'status_clipboard':
+        'Reading CSV data from clipboard...\n',
+    'status_file':
+        'Reading CSV data from %s...\n',
+    'status_html':
+        'HTML data found instead, no problem...\n'
+}
+
+
 def messager(msg, extra_info='', exit_after=False, wait=0):
     """Central message handling, optionally exit after display"""
 
-    messages = {
-        'error_clipboard_nodata':
-            'Error: No CSV data found in clipboard.\n',
-        'error_nodata':
-            'Error: No CSV data provided.\n',
-        'error_sort':
-            'Error: Unrecognized sort type: %s\n' % extra_info,
-        'info_tryhelp':
-            "Try 'nix_csv_parser.py --help' for more information\n",
-        'status_clipboard':
-            'Reading CSV data from clipboard...\n',
-        'status_file':
-            'Reading CSV data from %s...\n' % extra_info,
-        'status_html':
-            'HTML data found instead, no problem...\n'
-    }
-
-    if isinstance(msg, list):
-        for item in msg:
-            print(messages[item])
-    elif isinstance(msg, str):
-        print(messages[msg])
+    if isinstance(msg, str):
+        msg = [msg]
+
+    # Only the requested messages get formatted
+    for item in msg:
+        message = _MESSAGES[item]
+        if '%s' in message:
+            message %= extra_info
+        print(message)
 
     if exit_after:
         exit_wait(wait)
 
 
+@functools.lru_cache(maxsize=4096)
+def _hex_to_rgb(hex_value):
+    """Decode '#RRGGBB' into an (r, g, b) tuple"""
+
+    return tuple(bytes.fromhex(hex_value[1:]))  # skip '#' char
+
+
+@functools.lru_cache(maxsize=4096)
+def _swatch_html(hex_value, rgb_value):
+    """Generate swatch output HTML, repeated colors hit the cache"""
+
+    red, green, blue = rgb_value
+    return _HTML_TMPL % (hex_value, red, green, blue,
+                         hex_value, red, green, blue)
+
+
+def _swatch_text(hex_value, rgb_value):
+    """Generate swatch console output line"""
+
+    return '  %s HEX: %s - RGB: %s\n' % (SWATCH_CHAR, hex_value, rgb_value)
+
+
+@functools.lru_cache(maxsize=4096)
+def _hsv_keys(rgb_value):
+    """Compute (hue, sat, val) sort keys, orders the same as colorsys"""
+
+    red, green, blue = rgb_value
+    max_c = max(red, green, blue)
+    delta = max_c - min(red, green, blue)
+
+    if delta == 0:
+        return 0.0, 0.0, max_c
+
+    if max_c == red:
+        hue = ((green - blue) / delta) % 6
+    elif max_c == green:
+        hue = (blue - red) / delta + 2
+    else:
+        hue = (red - green) / delta + 4
+
+    return hue, delta / max_c, max_c
+
+
+# Sort type prefixes matched against --sort, in order of precedence
+_SORT_KEYS = (
+    ('hue', operator.attrgetter('_h')),
+    ('sat', operator.attrgetter('_s')),
+    ('val', operator.attrgetter('_v'))
+)
+
+
 class Swatch():
     """Hold swatch values, generate HTML output"""
 
+    __slots__ = ('hex_value', 'rgb_value', '_html', '_h', '_s', '_v')
+
     def __init__(self, hex_value, rgb_value):
         self.hex_value = hex_value
         self.rgb_value = rgb_value
-        self.html = ''
+        self._html = None
 
         if rgb_value is None:
             # Derive rgb value from hex if not provided
-            red, green, blue = bytes.fromhex(hex_value[1:])
-            self.rgb_value = (red, green, blue)
+            self.rgb_value = _hex_to_rgb(hex_value)
 
-        self._get_html_()
+        # Sort keys are computed once here rather than per sort
+        self._h, self._s, self._v = _hsv_keys(self.rgb_value)
 
-    def _get_html_(self):
-        """Generate swatch output HTML"""
+    @property
+    def html(self):
+        """Swatch output HTML, generated on first access"""
 
-        self.html = (
-            '<font color=%s size=%s>%s </font>'
-            '<b>HEX:</b> %s - <b>RGB:</b> %s<br>\n' % (
-                self.hex_value, SWATCH_SIZE, SWATCH_CHAR,
-                self.hex_value, str(self.rgb_value)
-            )
-        )
+        if self._html is None:
+            self._html = _swatch_html(self.hex_value, self.rgb_value)
+        return self._html
+
+    @property
+    def text(self):
+        """Swatch console output line"""
+
+        return _swatch_text(self.hex_value, self.rgb_value)
 
     def print(self):
         """Output swatch data to console"""
 
-        print('  %s HEX: %s - RGB: %s' % (
-            SWATCH_CHAR, self.hex_value, self.rgb_value
-        ))
+        print(self.text, end='')
 
 
 class CSVParser():
     """Parse Nix CSV data from file or clipboard"""
 
+    __slots__ = (
+        'mode', 'csv_file', 'swatches', 'swatch_count', 'output', 'console',
+        'sort_type', 'wait'
+    )
+
     def __init__(self, options):
         self.mode = 'file'
         self.csv_file = None
         self.swatches = []
         self.swatch_count = 0
+        self.output = io.StringIO()
+        self.console = io.StringIO()
         self.sort_type = options.sort
         self.wait = options.wait
 
         if options.file is None:
             clipboard = pyperclip.paste().strip('"')
-            if '.csv' in clipboard.lower():
+            if '.csv' in clipboard[:SNIFF_SIZE].lower():
                 self.csv_file = clipboard
             else:
                 self.mode = 'clipboard'
@@ -112,43 +196,63 @@ class CSVParser():
             self.csv_file = options.file
 
     def _get_swatches_from_data_(self, data, html=False):
-        """Retrieves swatch values from data"""
+        """Retrieves swatches from data"""
+
+        values = self._iter_swatch_values_(data, html)
+
+        if self.sort_type is None:
+            # Nothing to sort, buffer output as rows are read, skip Swatch objects
+            for hex_value, rgb_value in values:
+                self.console.write(_swatch_text(hex_value, rgb_value))
+                self.output.write(_swatch_html(hex_value, rgb_value))
+                self.swatch_count += 1
+        else:
+            self.swatches.extend(
+                Swatch(hex_value, rgb_value) for hex_value, rgb_value in values
+            )
+
+    @staticmethod
+    def _iter_swatch_values_(data, html=False):
+        """Yields (hex, rgb) swatch values from data"""
 
         if html is False:
-            # Treat CSV data as dictionary
-            reader = csv.DictReader(data)
+            reader = csv.reader(data)
+
+            # Map column names to indices once from the header row
+            header = next(reader, None)
+            if header is None:
+                return
+            columns = {name: index for index, name in enumerate(header)}
+
+            # Formatting differs between Pro and Mini sensors
+            if ' HEX' in columns:  # Mini
+                names = (' HEX', ' sRGB R', ' sRGB G', ' sRGB B')
+            else:  # Pro
+                names = ('HEX', 'R', 'G', 'B')
+            indices = [columns[name] for name in names]
+            last_idx = max(indices)
+            get_values = operator.itemgetter(*indices)
 
             # Grab that data!
             for row in reader:
-                # Formatting differs between Pro and Mini sensors
-                try:  # Mini
-                    hex_value = row[' HEX'].replace(' ', '')
-                    rgb_value = (
-                        int(row[' sRGB R']),
-                        int(row[' sRGB G']),
-                        int(row[' sRGB B'])
-                    )
-                except KeyError:  # Pro
-                    hex_value = row['HEX']
-                    try:
-                        rgb_value = (
-                            int(row['R']),
-                            int(row['G']),
-                            int(row['B'])
-                        )
-                    except TypeError:
-                        rgb_value = (0, 0, 0)
-
-                # Add a swatch to list if there is data
+                # Skip blank lines and trailing metadata rows
+                if len(row) <= last_idx:
+                    continue
+
+                hex_value, red, green, blue = get_values(row)
+                hex_value = hex_value.replace(' ', '')
+                rgb_value = (int(red), int(green), int(blue))
+
+                # Only yield a swatch if there is data
                 if hex_value != '' and rgb_value != (0, 0, 0):
-                    self.swatches.append(Swatch(hex_value, rgb_value))
+                    yield hex_value, rgb_value
         else:
-            for word in data.split():
-                if 'color=#' in word:
-                    hex_value = word.split('=')[1]  # grab HEX value after '='
-                    red, green, blue = bytes.fromhex(hex_value[1:])  # skip '#' char
-                    rgb_value = (red, green, blue)
-                    self.swatches.append(Swatch(hex_value, rgb_value))
+            for match in _COLOR_RE.finditer(data):
+                hex_value = match.group(1)
+                if match.group(2) is None:
+                    yield hex_value, _hex_to_rgb(hex_value)
+                else:
+                    yield hex_value, tuple(map(int, match.group(2, 3, 4)))
 
     def get_swatches(self):
         """Provides data to _get_swatches_from_data_"""
@@ -158,11 +262,14 @@ class CSVParser():
             messager('status_clipboard')
 
             clipboard_data = pyperclip.paste()
+            head = clipboard_data[:SNIFF_SIZE]  # format markers are up top
 
-            if 'HEX,' in clipboard_data:  # simple check for valid CSV data
-                self._get_swatches_from_data_(clipboard_data.splitlines())
-                # splitlines() only works here? ^ wut o_O
-            elif '<font color=#' in clipboard_data:  # must be our own HTML output
+            if 'HEX,' in head:  # simple check for valid CSV data
+                # csv.reader wants lines, StringIO yields them without a copy
+                self._get_swatches_from_data_(
+                    io.StringIO(clipboard_data, newline='')
+                )
+            elif '<font color=#' in head:  # must be our own HTML output
                 messager('status_html')
                 self._get_swatches_from_data_(clipboard_data, html=True)
             else:
@@ -173,7 +280,8 @@ class CSVParser():
         else:
             if self.csv_file is not None:
                 messager('status_file', self.csv_file)
-                with open(self.csv_file) as f:
+                with open(self.csv_file, newline='', encoding='utf-8',
+                          errors='replace', buffering=READ_BUFFER_SIZE) as f:
                     self._get_swatches_from_data_(f)
             else:
                 messager(
@@ -189,37 +297,27 @@ class CSVParser():
 
         sort_type = self.sort_type.lower()
 
-        if 'hue' in sort_type:
-            self.swatches = sorted(
-                self.swatches,
-                key=lambda x: (colorsys.rgb_to_hsv(
-                    x.rgb_value[0], x.rgb_value[1], x.rgb_value[2])[0])
-            )
-        elif 'sat' in sort_type:
-            self.swatches = sorted(
-                self.swatches,
-                key=lambda x: (colorsys.rgb_to_hsv(
-                    x.rgb_value[0], x.rgb_value[1], x.rgb_value[2])[1])
-            )
-        elif 'val' in sort_type:
-            self.swatches = sorted(
-                self.swatches,
-                key=lambda x: (colorsys.rgb_to_hsv(
-                    x.rgb_value[0], x.rgb_value[1], x.rgb_value[2])[2])
-            )
-        else:
-            messager(['error_sort', 'info_tryhelp'], extra_info=sort_type,
-                     exit_after=True, wait=self.wait)
+        for name, key in _SORT_KEYS:
+            if name in sort_type:
+                # HSV keys were precomputed on each Swatch
+                self.swatches.sort(key=key)
+                return
+
+        messager(['error_sort', 'info_tryhelp'], extra_info=sort_type,
+                 exit_after=True, wait=self.wait)
 
     def output_swatches(self):
         """ Output swatches to console and clipboard. """
 
-        output = ''
+        # Unsorted swatches were already buffered while parsing
         for swatch in self.swatches:
-            swatch.print()
-            output += swatch.html
+            self.console.write(swatch.text)
+            self.output.write(swatch.html)
+            self.swatch_count += 1
 
-        pyperclip.copy(output)
+        # One write instead of a print per swatch, slow consoles flush each
+        sys.stdout.write(self.console.getvalue())
+        pyperclip.copy(self.output.getvalue())
 
 
 def main():
@@ -256,7 +354,7 @@ def main():
     csv_parser.output_swatches()
 
     # Report.
-    count = len(csv_parser.swatches)
+    count = csv_parser.swatch_count
     if csv_parser.sort_type is not None:
         print(
             '\n...%i HTML swatches sorted by %s copied to the clipboard!\n' % (
@@ -101,6 +101,17 @@ class NixCSVParserTests(unittest.TestCase):
         print('### CLIPBOARD HTML')
         self.run_cmd(cmd_line)
 
+    def test_clipboard_html_rgb(self):
+        pyperclip.copy(
+            '<font color=#FFC700 data-rgb="255,199,0" size=72px>▄ </font><b>HEX:</b> #FFC700 - <b>RGB:</b> (255, 199, 0)<br>\n'
+            '<font color=#008052 data-rgb="0,128,82" size=72px>▄ </font><b>HEX:</b> #008052 - <b>RGB:</b> (0, 128, 82)<br>\n'
+            '<font color=#374E93 data-rgb="55,78,147" size=72px>▄ </font><b>HEX:</b> #374E93 - <b>RGB:</b> (55, 78, 147)<br>\n'
+            '<font color=#BC2E2E data-rgb="188,46,46" size=72px>▄ </font><b>HEX:</b> #BC2E2E - <b>RGB:</b> (188, 46, 46)<br>\n'
+        )
+        cmd_line = cmd + ' --sort hue'
+        print('### CLIPBOARD HTML - RGB ATTRIBUTE')
+        self.run_cmd(cmd_line)
+
     def test_no_data(self):
         cmd_line = cmd + ' --sort hue'
         pyperclip.copy('nodata')